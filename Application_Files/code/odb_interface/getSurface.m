@@ -215,7 +215,17 @@ elseif strcmpi(shell, 'yes') == 0.0 && strcmpi(shell, 'no') == 0.0
     shell = 'NO';
 end
 
-%% Create mainID list if necessary
+%% Get the surface pipeline environment variable
+pipeline = getappdata(0, 'surfacePipeline');
+if (isnumeric(pipeline) == 0.0) || (isempty(pipeline) == 1.0)
+    pipeline = 0.0;
+elseif (pipeline < 0.0) || (isnan(pipeline) == 1.0) || (isinf(pipeline) == 1.0)
+    pipeline = 0.0;
+else
+    pipeline = floor(pipeline);
+end
+
+%% Create dataset label file if necessary
 searchRegion = getappdata(0, 'searchRegion');
 
 if isnumeric(searchRegion) == 1.0
@@ -234,33 +244,21 @@ elseif strcmpi(searchRegion, 'DATASET') == 0.0 && strcmpi(searchRegion, 'INSTANC
     searchRegion = 'DATASET';
 end
 
-if (strcmpi(searchRegion, 'dataset') == 1.0) && (strcmpi(odbResultPosition, 'nodal') == 1.0)
-    searchRegion = 'INSTANCE';
-    messenger.writeMessage(276.0)
-elseif (strcmpi(searchRegion, 'dataset')) && (numberOfInstances > 1.0)
-    searchRegion = 'INSTANCE';
-    messenger.writeMessage(308.0)
-elseif strcmpi(searchRegion, 'dataset') == 1.0
-    fileName = [pwd, '/Application_Files/code/odb_interface/element_ids.dat'];
+if strcmpi(searchRegion, 'dataset') == 1.0
+    %{
+        The label file contains the number of dataset rows, followed by
+        the main IDs, sub IDs and instance numbers as int32 arrays. The
+        dataset does not specify the part instance of each item, so the
+        instance number is zero (any part instance)
+    %}
+    fileName = [pwd, '/Application_Files/code/odb_interface/dataset_labels.dat'];
     fid = fopen(fileName, 'w+');
-    uniqueMainID = unique(mainID);
-    L = length(uniqueMainID);
-    
-    % OLD AND SLOW METHOD
-%     for i = 1:L
-%         if i == L
-%             fprintf(fid, '%.0f', uniqueMainID(i));
-%         else
-%             fprintf(fid, '%.0f, ', uniqueMainID(i));
-%         end
-%     end
-    
-    if length(uniqueMainID) == 1.0
-        fprintf(fid, '%.0f', uniqueMainID);
-    else
-        fprintf(fid, '%.0f, ', uniqueMainID(1:L-1));
-        fprintf(fid, '%.0f', uniqueMainID(L));
-    end
+    L = length(mainID);
+    
+    fwrite(fid, L, 'int32');
+    fwrite(fid, mainID, 'int32');
+    fwrite(fid, subID, 'int32');
+    fwrite(fid, zeros(L, 1.0), 'int32');
     fclose(fid);
 end
 
@@ -281,9 +279,9 @@ if getappdata(0, 'autoExport_upgradeODB') == 1.0
             setappdata(0, 'items', 'ALL')
         end
         
-        % Flush the element ID file if applicable
-        if exist([pwd, '/Application_Files/code/odb_interface/element_ids.dat'], 'file') == 2.0
-            delete([pwd, '/Application_Files/code/odb_interface/element_ids.dat'])
+        % Flush the dataset label file if applicable
+        if exist([pwd, '/Application_Files/code/odb_interface/dataset_labels.dat'], 'file') == 2.0
+            delete([pwd, '/Application_Files/code/odb_interface/dataset_labels.dat'])
         end
         
         return
@@ -304,18 +302,18 @@ end
 
 %% Run the script
 % Run script like this:
-% abaqus python getSurface_qft.py -- <odbName> <position> <shell> <instance-1>... <instance-n> <n>
+% abaqus python getSurface_qft.py -- -pipeline=<n> <odbName> <position> <shell> <instance-1>... <instance-n> <n>
 
 fprintf('\n[PRE] Detecting model surface')
 fprintf(fid_status, '\n[PRE] Detecting model surface');
 
-inputString = sprintf('%s python Application_Files\\code\\odb_interface\\getSurface.py -- "%s" %s %s %s %s %.0f',...
-    abqCmd, outputDatabase, odbResultPosition, searchRegion, shell, partInstance, numberOfInstances);
+inputString = sprintf('%s python Application_Files\\code\\odb_interface\\getSurface.py -- -pipeline=%.0f "%s" %s %s %s %s %.0f',...
+    abqCmd, pipeline, outputDatabase, odbResultPosition, searchRegion, shell, partInstance, numberOfInstances);
 
 [status, message] = system(inputString);
 
 if strcmpi(searchRegion, 'dataset') == 1.0
-    % Delete the element ID file
+    % Delete the dataset label file
     delete(fileName);
 end
 
@@ -361,7 +359,55 @@ if exist([tempName, '.odb'], 'file') == 2.0
 end
 
 % Read the output
-if strcmpi(odbResultPosition, 'nodal') == 1.0
+if (strcmpi(odbResultPosition, 'nodal') == 1.0) && (strcmpi(searchRegion, 'dataset') == 1.0)
+    % Get the indices of the dataset items on the surface
+    fileName = sprintf('%s\\Application_Files\\code\\odb_interface\\surface_indices.dat', pwd);
+    fid = fopen(fileName, 'r');
+    intersectingIndexes = fread(fid, inf, 'int32');
+    fclose(fid);
+    
+    % Delete the index file
+    delete(fileName)
+    
+    % Check if any dataset items lie on the surface
+    if isempty(intersectingIndexes) == 1.0
+        messenger.writeMessage(277.0)
+        if strcmpi(items, 'surface') == 1.0
+            items = 'ALL';
+            setappdata(0, 'items', 'ALL')
+        end
+        return
+    end
+    
+    mainID = mainID(intersectingIndexes);
+    subID = subID(intersectingIndexes);
+    
+    % Update the tensors
+    Sxx = Sxx(intersectingIndexes, :);
+    Syy = Syy(intersectingIndexes, :);
+    Szz = Szz(intersectingIndexes, :);
+    Txy = Txy(intersectingIndexes, :);
+    Tyz = Tyz(intersectingIndexes, :);
+    Txz = Txz(intersectingIndexes, :);
+    
+    setappdata(0, 'Sxx', Sxx)
+    setappdata(0, 'Syy', Syy)
+    setappdata(0, 'Szz', Szz)
+    setappdata(0, 'Txy', Txy)
+    setappdata(0, 'Tyz', Tyz)
+    setappdata(0, 'Txz', Txz)
+    
+    % Update the number of items
+    N = length(mainID);
+    
+    % Update the message file
+    setappdata(0, 'message_274', N)
+    if N == N0
+        messenger.writeMessage(280.0)
+    else
+        messenger.writeMessage(274.0)
+    end
+elseif strcmpi(odbResultPosition, 'nodal') == 1.0
     fileName = sprintf('%s\\Application_Files\\code\\odb_interface\\surface_nodes.dat', pwd);
     surfaceNodes = importdata(fileName, ',');
     mainID_surface = str2num(cell2mat(surfaceNodes))'; %#ok<ST2NM>
@@ -1,11 +1,12 @@
 #GETSURFACE Python script to extract the surface elements/nodes from an Abaqus ODB file.
-#	<abaqus-id> python getSurface.py -- ODB_NAME POSITION SEARCH_REGION SHELL_FACES PART_INSTANCES
-#   N_INSTANCES searches an Abaqus ODB file for the free surface at a given element position,
-#   search region and part instance.
+#	<abaqus-id> python getSurface.py -- [OPTIONS] ODB_NAME POSITION SEARCH_REGION SHELL_FACES
+#   PART_INSTANCES N_INSTANCES searches an Abaqus ODB file for the free surface at a given element
+#   position, search region and part instance.
 #
+#   OPTIONS: Optional arguments of the form -<option>=<value>
 #   ODB_NAME: Full path to the output database file
-#   POSITION: Element position
-#   SEARCH_REGION: Search either the part instance or a list of element IDs
+#   POSITION: Element position(s)
+#   SEARCH_REGION: Search either the part instance or the dataset labels
 #   SHELL_FACES: Treat shell surface as whole shell or free shell faces
 #   PART_INSTANCES: Part instance list
 #   N_INSTANCES: Number of part instances
@@ -20,6 +21,47 @@
 #	Example command line usage for N part instances:
 #	abaqus python getSurface.py -- <preceding arguments> "PART-1-1" "PART-2-1" ... "PART-N-1" N
 #
+#	The following options are available:
+#	-pipeline=<n>: Read the ODB in a separate thread and process the
+#	element faces in <n> worker threads (default 0, sequential)
+#
+#	If SEARCH_REGION=DATASET, the dataset labels are read from the
+#	binary file dataset_labels.dat. The file contains the number of
+#	dataset rows followed by the main IDs, sub IDs and instance
+#	numbers of each row as int32 arrays. The instance number is the
+#	1-based position of the part instance in PART_INSTANCES, or 0 if
+#	the label may belong to any of the part instances.
+#
+#	For ELEMENTAL and CENTROID positions, only the dataset elements
+#	are searched. For the NODAL position, the whole part instance is
+#	searched and the 1-based indices of the dataset rows which lie on
+#	the surface are written to surface_indices.dat as int32.
+#
+#	POSITION may also be a comma-separated list of positions, e.g.
+#	NODAL,ELEMENTAL,CENTROID. The free faces are then found once for
+#	all positions, and the output file names are suffixed with the
+#	position, e.g. surface_elements_centroid.dat.
+#
+#	Example command line usage with pipelined ODB reading:
+#	abaqus python getSurface.py -- -pipeline=2 "..\<file-name>.odb" ELEMENTAL INSTANCE NO "PART-1-1" 1
+#
+#	The surface detection algorithm can also be imported by
+#	Abaqus Python scripts which already have the ODB open:
+#
+#	sys.path.append('<qft-root>/Application_Files/code/odb_interface')
+#	import getSurface
+#	surface = getSurface.getSurface(odb, ['PART-1-1'], 'ELEMENTAL')
+#	elementLabels = list(surface['PART-1-1']['elements'].labels())
+#
+#	In this case, no files are read or written and the ODB is not
+#	closed. The command line interface is implemented by main().
+#
+#	Surface nodes and elements are returned as LabelSet objects,
+#	which store the labels of each part instance as runs of
+#	consecutive labels. LabelSet supports union (|), intersection
+#	(&) and difference (-) across part instances, and can be saved
+#	with LabelSet.write() and loaded with LabelSet.read().
+#
 #	This surface detection algorithm relies on the principle
 #	that, if the set of nodes of element face A does not have
 #	a union with any other element face, then A belongs on
@@ -31,14 +73,21 @@
 #	numbering information was taken from "Part VI: Elements" of
 #	the Abaqus Analysis User's Guide.
 #
+#	In pipelined mode, one reader thread pulls the element
+#	connectivity from the part instance in chunks of CHUNK_SIZE
+#	elements and places them in a queue holding at most
+#	QUEUE_SIZE chunks. The worker threads take chunks from the
+#	queue and convert them into element faces, so that ODB
+#	access is overlapped with face processing.
+#
 #   GETSURFACE.py is used internally by Quick Fatigue Tool. The user is not required to run this
 #   file.
 #
 #   Reference section in Quick Fatigue Tool User Guide
 #      4.5.3 Custom analysis items
 #
-#   Quick Fatigue Tool 6.11-12 Copyright Louis Vallance 2018
-#   Last modified 28-Mar-2018 09:40:26 GMT
+#   Quick Fatigue Tool 6.11-13 Copyright Louis Vallance 2018
+#   Last modified 19-Oct-2026 09:12:44 GMT
 
 import os
 from odbAccess import *
@@ -48,713 +97,1106 @@ import string
 from operator import itemgetter
 from collections import Counter
 import sys
+import threading
+import Queue
+import array
+import bisect
 
-N_INSTANCES = int(sys.argv[-1])
-PART_INSTANCES = []
-
-for i in range(N_INSTANCES):
-	PART_INSTANCES.append(sys.argv[-(i + 2)])
-	
-ODB_NAME = sys.argv[-5 - N_INSTANCES]
-POSITION = sys.argv[-4 - N_INSTANCES]
-SEARCH_REGION = sys.argv[-3 - N_INSTANCES]
-SHELL_FACES = sys.argv[-2 - N_INSTANCES]
+# Number of elements read from the ODB per chunk in pipelined mode:
+CHUNK_SIZE = 2000
 
-# Debug output:
-print "ODB Name: %s" % ODB_NAME
-print "Result position: %s" % POSITION
-print "Search region: %s" % SEARCH_REGION
-print "Shell faces: %s" % SHELL_FACES
-print "Part instance: %s" % PART_INSTANCES
-print "Number of instances: %s\n" % N_INSTANCES
+# Maximum number of chunks held in the queue in pipelined mode:
+QUEUE_SIZE = 8
 
-# Open ODB file:
-odb = openOdb(path = ODB_NAME)
-
-# Get number of part instances:
-nInstances = len(PART_INSTANCES)
-
-# Initialize list containing all surface nodes and elements:
-surfaceNodesAll = [[0 for x in range(2)] for y in range(nInstances)]
-surfaceElementsAll = [[0 for x in range(2)] for y in range(nInstances)]
-surfaceConnectingNodesAll = [[0 for x in range(2)] for y in range(nInstances)]
-
-# Get the element IDs:
-if (SEARCH_REGION.lower() == 'dataset'):
-	directory = "%s/Application_Files/code/odb_interface/element_ids.dat" % os.path.dirname(os.path.abspath("__file__"))
-	fid = open(directory, 'r')
-	f = fid.read()
-	ELEMENT_ID = f.split(',')
-	fid.close()
-
-# Initialize buffer containing any supported elements
-unsupportedElements = []
-	
-# Loop over each part instance to find surface:
-for instanceNumber in range(nInstances):
-	# Get ODB part instance:
-	partInstance = PART_INSTANCES[instanceNumber]
-	instance = odb.rootAssembly.instances[partInstance]
+def getFaces(elementType, conn, shellFaces):
+	# Construct the faces of a single element from its connectivity.
+	# Returns the face list, the element shape (0 = tet, 1 = hex) and
+	# the geometric order (0 = linear, 1 = quadratic). If the element is
+	# not supported, FACES is None.
+	faces = []
+	shape = None
+	order = None
 	
-	# Get number of elements belonging to part instance:
-	if (SEARCH_REGION.lower() == 'dataset'):
-		N = len(ELEMENT_ID)
-	else:
-		N = len(instance.elements)
+	# ELTYPE 3D continuum hexahedron (brick) elements:
+	if ((elementType == 'C3D8') or (elementType == 'C3D8H') or (elementType == 'C3D8I') or (elementType == 'C3D8IH') or (elementType == 'C3D8R') or (elementType == 'C3D8RH') or (elementType == 'C3D8S') or (elementType == 'C3D8HS') or (elementType == 'C3D20') or (elementType == 'C3D20H') or (elementType == 'C3D20R') or (elementType == 'C3D20RH') or (elementType == 'C3D8T') or (elementType == 'C3D8HT') or (elementType == 'C3D8RT') or (elementType == 'C3D8RHT') or (elementType == 'C3D20T') or (elementType == 'C3D20HT') or (elementType == 'C3D20RT') or (elementType == 'C3D20RHT') or (elementType == 'C3D8C3') or (elementType == 'C3D8IC3') or (elementType == 'C3D8RC3') or (elementType == 'C3D8HC3') or (elementType == 'C3D8RHC3') or (elementType == 'C3D8IHC3') or (elementType == 'C3D20C3') or (elementType == 'C3D20HC3') or (elementType == 'C3D20RC3') or (elementType == 'C3D20RHC3')):
 		
-	# Initialize list containing all element faces (maximum 8 nodes per element face, 6*N element faces):
-	faces = [[0 for x in range(8)] for y in range(6*N)]
-	
-	# Initialize indexing variable for element face data:
-	index = 0
-	
-	# Container for existing element types (reset per instance iteration):
-	tetAndHex = [0 for x in range(2)]
-	
-	# Container for existing element orders (reset per instance iteration):
-	linearAndQuad = [0 for x in range(2)]
-	
-	for i in range(N):
-		if (SEARCH_REGION.lower() == 'dataset'):
-			# Get element object:
-			element = instance.getElementFromLabel(int(ELEMENT_ID[i]))
-			# Get element connectivity data:
-			conn = element.connectivity
+		# Linear:
+		if (len(conn) == 8):
+			faces.append(itemgetter(*[0, 1, 2, 3])(conn))
+			faces.append(itemgetter(*[4, 7, 6, 5])(conn))
+			faces.append(itemgetter(*[0, 4, 5, 1])(conn))
+			faces.append(itemgetter(*[1, 5, 6, 2])(conn))
+			faces.append(itemgetter(*[2, 6, 7, 3])(conn))
+			faces.append(itemgetter(*[3, 7, 4, 0])(conn))
+			
+			order = 0
+			
+		# Quadratic:
+		else:
+			faces.append(itemgetter(*[0, 1, 2, 3, 8, 9, 10, 11])(conn))
+			faces.append(itemgetter(*[4, 7, 6, 5, 15, 14, 13, 12])(conn))
+			faces.append(itemgetter(*[0, 4, 5, 1, 16, 12, 17, 8])(conn))
+			faces.append(itemgetter(*[1, 5, 6, 2, 17, 13, 18, 9])(conn))
+			faces.append(itemgetter(*[2, 6, 7, 3, 18, 14, 19, 10])(conn))
+			faces.append(itemgetter(*[3, 7, 4, 0, 19, 15, 16, 11])(conn))
+			
+			order = 1
+		
+		shape = 1
+		
+	# ELTYPE 3D continuum tetrahedral elements:
+	elif ((elementType == 'C3D4') or (elementType == 'C3D4H') or (elementType == 'C3D10') or (elementType == 'C3D10H') or (elementType == 'C3D10HS') or (elementType == 'C3D10M') or (elementType == 'C3D10MH') or (elementType == 'C3D4T') or (elementType == 'C3D10T') or (elementType == 'C3D10HT') or (elementType == 'C3D10MT') or (elementType == 'C3D10MHT')):
+		
+		# Linear:
+		if (len(conn) == 4):
+			faces.append(itemgetter(*[0, 1, 2])(conn))
+			faces.append(itemgetter(*[0, 3, 1])(conn))
+			faces.append(itemgetter(*[1, 3, 2])(conn))
+			faces.append(itemgetter(*[2, 3, 0])(conn))
+			
+			order = 0
+			
+		# Quadratic:
 		else:
-			# Get element object:
-			element = instance.elements[i]
-			# Get element connectivity data:
-			conn = instance.getElementFromLabel(element.label).connectivity
+			faces.append(itemgetter(*[0, 1, 2, 4, 5, 6])(conn))
+			faces.append(itemgetter(*[0, 3, 1, 7, 8, 4])(conn))
+			faces.append(itemgetter(*[1, 3, 2, 8, 9, 5])(conn))
+			faces.append(itemgetter(*[2, 3, 0, 9, 7, 6])(conn))
+			
+			order = 1
+		
+		shape = 0
+		
+	# ELTYPE 3D continuum wedge (triangular prism) elements:
+	elif ((elementType == 'C3D6') or (elementType == 'C3D6T') or (elementType == 'C3D6H') or (elementType == 'C3D15') or (elementType == 'C3D15H')):
+		
+		# Linear:
+		if (len(conn) == 6):
+			faces.append(itemgetter(*[0, 1, 2])(conn))
+			faces.append(itemgetter(*[3, 5, 4])(conn))
+			faces.append(itemgetter(*[0, 3, 4, 1])(conn))
+			faces.append(itemgetter(*[1, 4, 5, 2])(conn))
+			faces.append(itemgetter(*[2, 5, 3, 0])(conn))
 			
-		# ELTYPE 3D continuum hexahedron (brick) elements:
-		if ((element.type == 'C3D8') or (element.type == 'C3D8H') or (element.type == 'C3D8I') or (element.type == 'C3D8IH') or (element.type == 'C3D8R') or (element.type == 'C3D8RH') or (element.type == 'C3D8S') or (element.type == 'C3D8HS') or (element.type == 'C3D20') or (element.type == 'C3D20H') or (element.type == 'C3D20R') or (element.type == 'C3D20RH') or (element.type == 'C3D8T') or (element.type == 'C3D8HT') or (element.type == 'C3D8RT') or (element.type == 'C3D8RHT') or (element.type == 'C3D20T') or (element.type == 'C3D20HT') or (element.type == 'C3D20RT') or (element.type == 'C3D20RHT') or (element.type == 'C3D8C3') or (element.type == 'C3D8IC3') or (element.type == 'C3D8RC3') or (element.type == 'C3D8HC3') or (element.type == 'C3D8RHC3') or (element.type == 'C3D8IHC3') or (element.type == 'C3D20C3') or (element.type == 'C3D20HC3') or (element.type == 'C3D20RC3') or (element.type == 'C3D20RHC3')):
+			order = 0
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+		# Quadratic:
+		else:
+			faces.append(itemgetter(*[0, 1, 2, 6, 7, 8])(conn))
+			faces.append(itemgetter(*[3, 5, 4, 11, 10, 9])(conn))
+			faces.append(itemgetter(*[0, 3, 4, 1, 12, 9, 13, 6])(conn))
+			faces.append(itemgetter(*[1, 4, 5, 2, 13, 10, 14, 7])(conn))
+			faces.append(itemgetter(*[2, 5, 3, 0, 14, 11, 12, 8])(conn))
+			
+			order = 1
+		
+	# ELTYPE 3D continuum pyramid elements:
+	elif ((elementType == 'C3D5') or (elementType == 'C3D5H')):
+		
+		faces.append(itemgetter(*[0, 1, 2, 3])(conn))
+		faces.append(itemgetter(*[0, 4 , 1])(conn))
+		faces.append(itemgetter(*[1, 4, 2])(conn))
+		faces.append(itemgetter(*[2, 4, 3])(conn))
+		faces.append(itemgetter(*[3, 4, 0])(conn))
+		
+		order = 0
+		
+	# ELTYPE 3D conventional triangular shell elements:
+	elif ((elementType == 'STRI3') or (elementType == 'S3') or (elementType == 'S3R') or (elementType == 'S3RS') or (elementType == 'STRI65') or (elementType == 'S3T') or (elementType == 'S3RT')):
+		
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
 			# Linear:
-			if (len(conn) == 8):
-				faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-				faces[index + 1][:] = itemgetter(*[4, 7, 6, 5])(conn)
-				faces[index + 2][:] = itemgetter(*[0, 4, 5, 1])(conn)
-				faces[index + 3][:] = itemgetter(*[1, 5, 6, 2])(conn)
-				faces[index + 4][:] = itemgetter(*[2, 6, 7, 3])(conn)
-				faces[index + 5][:] = itemgetter(*[3, 7, 4, 0])(conn)
+			if (len(conn) == 3):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 0])(conn))
 				
-				linearAndQuad[0] = 1
+				order = 0
 				
 			# Quadratic:
 			else:
-				faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 8, 9, 10, 11])(conn)
-				faces[index + 1][:] = itemgetter(*[4, 7, 6, 5, 15, 14, 13, 12])(conn)
-				faces[index + 2][:] = itemgetter(*[0, 4, 5, 1, 16, 12, 17, 8])(conn)
-				faces[index + 3][:] = itemgetter(*[1, 5, 6, 2, 17, 13, 18, 9])(conn)
-				faces[index + 4][:] = itemgetter(*[2, 6, 7, 3, 18, 14, 19, 10])(conn)
-				faces[index + 5][:] = itemgetter(*[3, 7, 4, 0, 19, 15, 16, 11])(conn)
+				faces.append(itemgetter(*[0, 1, 3])(conn))
+				faces.append(itemgetter(*[1, 2, 4])(conn))
+				faces.append(itemgetter(*[2, 0, 5])(conn))
 				
-				linearAndQuad[1] = 1
+				order = 1
 			
-			indexIncrement = 6
-			tetAndHex[1] = 1
+		# Treat shell surface as whole shell:
+		else:
 			
-		# ELTYPE 3D continuum tetrahedral elements:
-		elif ((element.type == 'C3D4') or (element.type == 'C3D4H') or (element.type == 'C3D10') or (element.type == 'C3D10H') or (element.type == 'C3D10HS') or (element.type == 'C3D10M') or (element.type == 'C3D10MH') or (element.type == 'C3D4T') or (element.type == 'C3D10T') or (element.type == 'C3D10HT') or (element.type == 'C3D10MT') or (element.type == 'C3D10MHT')):
+			# Linear:
+			if (len(conn) == 3.0):
+				faces.append(itemgetter(*[0, 1, 2])(conn))
+				
+				order = 0
+				
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5])(conn))
+				
+				order = 1
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	# ELTYPE 3D conventional quadrilateral shell elements:
+	elif ((elementType == 'S4') or (elementType == 'S4R') or (elementType == 'S4RS') or (elementType == 'S4RSW') or (elementType == 'S4R5') or (elementType == 'S8R') or (elementType == 'S8R5') or (elementType == 'S4T') or (elementType == 'S4RT') or (elementType == 'S8RT') or (elementType == 'S9R5')):
+		
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
 			# Linear:
 			if (len(conn) == 4):
-				faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-				faces[index + 1][:] = itemgetter(*[0, 3, 1])(conn)
-				faces[index + 2][:] = itemgetter(*[1, 3, 2])(conn)
-				faces[index + 3][:] = itemgetter(*[2, 3, 0])(conn)
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 3])(conn))
+				faces.append(itemgetter(*[3, 0])(conn))
 				
-				linearAndQuad[0] = 1
+				order = 0
 				
 			# Quadratic:
 			else:
-				faces[index + 0][:] = itemgetter(*[0, 1, 2, 4, 5, 6])(conn)
-				faces[index + 1][:] = itemgetter(*[0, 3, 1, 7, 8, 4])(conn)
-				faces[index + 2][:] = itemgetter(*[1, 3, 2, 8, 9, 5])(conn)
-				faces[index + 3][:] = itemgetter(*[2, 3, 0, 9, 7, 6])(conn)
+				faces.append(itemgetter(*[0, 1, 4])(conn))
+				faces.append(itemgetter(*[1, 2, 5])(conn))
+				faces.append(itemgetter(*[2, 3, 6])(conn))
+				faces.append(itemgetter(*[3, 0, 7])(conn))
 				
-				linearAndQuad[1] = 1
+				order = 1
 			
-			indexIncrement = 4
-			tetAndHex[0] = 1
+		# Treat shell surface as whole shell:
+		else:
 			
-		# ELTYPE 3D continuum wedge (triangular prism) elements:
-		elif ((element.type == 'C3D6') or (element.type == 'C3D6T') or (element.type == 'C3D6H') or (element.type == 'C3D15') or (element.type == 'C3D15H')):
+			# Linear:
+			if (len(conn) == 4.0):
+				faces.append(itemgetter(*[0, 1, 2, 3])(conn))
+				
+				order = 0
+				
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn))
+				
+				order = 1
+			
+	# ELTYPE General triangular membrane elements:
+	elif ((elementType == 'M3D3') or (elementType == 'M3D6')):
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
 			# Linear:
-			if (len(conn) == 6):
-				faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-				faces[index + 1][:] = itemgetter(*[3, 5, 4])(conn)
-				faces[index + 2][:] = itemgetter(*[0, 3, 4, 1])(conn)
-				faces[index + 3][:] = itemgetter(*[1, 4, 5, 2])(conn)
-				faces[index + 4][:] = itemgetter(*[2, 5, 3, 0])(conn)
+			if (len(conn) == 3):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 0])(conn))
 				
-				linearAndQuad[0] = 1
+				order = 0
 				
 			# Quadratic:
 			else:
-				faces[index + 0][:] = itemgetter(*[0, 1, 2, 6, 7, 8])(conn)
-				faces[index + 1][:] = itemgetter(*[3, 5, 4, 11, 10, 9])(conn)
-				faces[index + 2][:] = itemgetter(*[0, 3, 4, 1, 12, 9, 13, 6])(conn)
-				faces[index + 3][:] = itemgetter(*[1, 4, 5, 2, 13, 10, 14, 7])(conn)
-				faces[index + 4][:] = itemgetter(*[2, 5, 3, 0, 14, 11, 12, 8])(conn)
+				faces.append(itemgetter(*[0, 1, 3])(conn))
+				faces.append(itemgetter(*[1, 2, 4])(conn))
+				faces.append(itemgetter(*[2, 0, 5])(conn))
 				
-				linearAndQuad[1] = 1
+				order = 1
 			
-			indexIncrement = 5
+		# Treat shell surface as whole shell:
+		else:
 			
-		# ELTYPE 3D continuum pyramid elements:
-		elif ((element.type == 'C3D5') or (element.type == 'C3D5H')):
+			# Linear:
+			if (len(conn) == 3.0):
+				faces.append(itemgetter(*[0, 1, 2])(conn))
+				
+				order = 0
+				
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5])(conn))
+				
+				order = 1
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	# ELTYPE General quadrilateral membrane elements:
+	elif ((elementType == 'M3D4') or (elementType == 'M3D4R') or (elementType == 'M3D8') or (elementType == 'M3D8R') or (elementType == 'M3D9') or (elementType == 'M3D9R')):
 			
-			faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-			faces[index + 1][:] = itemgetter(*[0, 4 , 1])(conn)
-			faces[index + 2][:] = itemgetter(*[1, 4, 2])(conn)
-			faces[index + 3][:] = itemgetter(*[2, 4, 3])(conn)
-			faces[index + 4][:] = itemgetter(*[3, 4, 0])(conn)
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
-			linearAndQuad[0] = 1
+			# Linear:
+			if (len(conn) == 4):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 3])(conn))
+				faces.append(itemgetter(*[3, 0])(conn))
+				
+				order = 0
+				
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 4])(conn))
+				faces.append(itemgetter(*[1, 2, 5])(conn))
+				faces.append(itemgetter(*[2, 3, 6])(conn))
+				faces.append(itemgetter(*[3, 0, 7])(conn))
+				
+				order = 1
 			
-			indexIncrement = 5
+		# Treat shell surface as whole shell:
+		else:
 			
-		# ELTYPE 3D conventional triangular shell elements:
-		elif ((element.type == 'STRI3') or (element.type == 'S3') or (element.type == 'S3R') or (element.type == 'S3RS') or (element.type == 'STRI65') or (element.type == 'S3T') or (element.type == 'S3RT')):
+			# Linear:
+			if (len(conn) == 4.0):
+				faces.append(itemgetter(*[0, 1, 2, 3])(conn))
+				
+				order = 0
+				
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn))
+				
+				order = 1
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	# ELTYPE 3D continuum triangular shell elements:
+	elif ((elementType == 'SC6R') or (elementType == 'SC6RT')):
+		
+		faces.append(itemgetter(*[0, 1, 2])(conn))
+		faces.append(itemgetter(*[3, 5, 4])(conn))
+		faces.append(itemgetter(*[0, 3, 4, 1])(conn))
+		faces.append(itemgetter(*[1, 4, 5, 2])(conn))
+		faces.append(itemgetter(*[2, 5, 3, 0])(conn))
+		
+		order = 0
+		
+	# ELTYPE 3D continuum hexahedral shell elements:
+	elif ((elementType == 'SC8R') or (elementType == 'SC8RT')):
+		
+		faces.append(itemgetter(*[0, 1, 2, 3])(conn))
+		faces.append(itemgetter(*[4, 7, 6, 5])(conn))
+		faces.append(itemgetter(*[0, 4, 5, 1])(conn))
+		faces.append(itemgetter(*[1, 5, 6, 2])(conn))
+		faces.append(itemgetter(*[2, 6, 7, 3])(conn))
+		faces.append(itemgetter(*[3, 7, 4, 0])(conn))
+		
+		order = 0
+		
+	# ELTYPE 3D continuum solid hexahedral shell elements
+	elif (elementType == 'CSS8'):
+		
+		faces.append(itemgetter(*[0, 1, 2, 3])(conn))
+		faces.append(itemgetter(*[4, 7, 6, 5])(conn))
+		faces.append(itemgetter(*[0, 4, 5, 1])(conn))
+		faces.append(itemgetter(*[1, 5, 6, 2])(conn))
+		faces.append(itemgetter(*[2, 6, 7, 3])(conn))
+		faces.append(itemgetter(*[3, 7, 4, 0])(conn))
+		
+		order = 0
+		
+	# ELTYPE 2D continuum triangular elements:
+	elif ((elementType == 'CPE3') or (elementType == 'CPE3H') or (elementType == 'CPE6') or (elementType == 'CPE6H') or (elementType == 'CPE6M') or (elementType == 'CPE6MH') or (elementType == 'CPS3') or (elementType == 'CPS6') or (elementType == 'CPS6M') or (elementType == 'CPEG3') or (elementType == 'CPEG3H') or (elementType == 'CPEG6') or (elementType == 'CPEG6H') or (elementType == 'CPEG6M') or (elementType == 'CPEG6MH')):
+		
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
+			# Linear:
+			if (len(conn) == 3):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 0])(conn))
 				
-				# Linear:
-				if (len(conn) == 3):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 3])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 4])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0, 5])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 3
+				order = 0
 				
-			# Treat shell surface as whole shell:
+			# Quadratic:
 			else:
+				faces.append(itemgetter(*[0, 1, 3])(conn))
+				faces.append(itemgetter(*[1, 2, 4])(conn))
+				faces.append(itemgetter(*[2, 0, 5])(conn))
 				
-				# Linear:
-				if (len(conn) == 3.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5])(conn)
-					
-					linearAndQuad[1] = 1
+				order = 1
+			
+		# Treat shell surface as whole shell:
+		else:
+			
+			# Linear:
+			if (len(conn) == 4.0):
+				faces.append(itemgetter(*[0, 1, 2])(conn))
 				
-				indexIncrement = 1
+				order = 0
 				
-		# ELTYPE 3D conventional quadrilateral shell elements:
-		elif ((element.type == 'S4') or (element.type == 'S4R') or (element.type == 'S4RS') or (element.type == 'S4RSW') or (element.type == 'S4R5') or (element.type == 'S8R') or (element.type == 'S8R5') or (element.type == 'S4T') or (element.type == 'S4RT') or (element.type == 'S8RT') or (element.type == 'S9R5')):
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5])(conn))
+				
+				order = 1
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	# ELTYPE 2D Continuum quadrilateral elements:
+	elif ((elementType == 'CPE4') or (elementType == 'CPE4H') or (elementType == 'CPE4I') or (elementType == 'CPE4IH') or (elementType == 'CPE4R') or (elementType == 'CPE4RH') or (elementType == 'CPE8') or (elementType == 'CPE8H') or (elementType == 'CPE8R') or (elementType == 'CPE8RH') or (elementType == 'CPS4') or (elementType == 'CPS4I') or (elementType == 'CPS4R') or (elementType == 'CPS8') or (elementType == 'CPS8R') or (elementType == 'CPEG4') or (elementType == 'CPEG4H') or (elementType == 'CPEG4I') or (elementType == 'CPEG4IH') or (elementType == 'CPEG4R') or (elementType == 'CPEG4RH') or (elementType == 'CPEG8') or (elementType == 'CPEG8H') or (elementType == 'CPEG8R') or (elementType == 'CPEG8RH')):
+		
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
+			# Linear:
+			if (len(conn) == 4):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 3])(conn))
+				faces.append(itemgetter(*[3, 0])(conn))
 				
-				# Linear:
-				if (len(conn) == 4):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 4])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 5])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3, 6])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0, 7])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 4
+				order = 0
 				
-			# Treat shell surface as whole shell:
+			# Quadratic:
 			else:
+				faces.append(itemgetter(*[0, 1, 4])(conn))
+				faces.append(itemgetter(*[1, 2, 5])(conn))
+				faces.append(itemgetter(*[2, 3, 6])(conn))
+				faces.append(itemgetter(*[3, 0, 7])(conn))
 				
-				# Linear:
-				if (len(conn) == 4.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn)
-					
-					linearAndQuad[1] = 1
+				order = 1
+			
+		# Treat shell surface as whole shell:
+		else:
+			
+			# Linear:
+			if (len(conn) == 4.0):
+				faces.append(itemgetter(*[0, 1, 2, 3])(conn))
 				
-				indexIncrement = 1
+				order = 0
 				
-		# ELTYPE General triangular membrane elements:
-		elif ((element.type == 'M3D3') or (element.type == 'M3D6')):
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn))
 				
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+				order = 1
+			
+	# ELTYPE Axisymmetric solid triangular elements:
+	elif ((elementType == 'CAX3') or (elementType == 'CAX3H') or (elementType == 'CGAX3') or (elementType == 'CGAX3H') or (elementType == 'CAX3T') or (elementType == 'CGAX3T') or (elementType == 'CGAX3HT') or (elementType == 'CAX6') or (elementType == 'CAX6H') or (elementType == 'CAX6M') or (elementType == 'CAX6MH') or (elementType == 'CGAX6') or (elementType == 'CGAX6H') or (elementType == 'CGAX6M') or (elementType == 'CGAX6MH') or (elementType == 'CAX6MT') or (elementType == 'CAX6MHT') or (elementType == 'CGAX6MT') or (elementType == 'CGAX6MHT') or (elementType == 'CAX6MP') or (elementType == 'CAX6MPH')):
+		
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
+			# Linear:
+			if (len(conn) == 3):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 0])(conn))
 				
-				# Linear:
-				if (len(conn) == 3):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 3])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 4])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0, 5])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 3
+				order = 0
 				
-			# Treat shell surface as whole shell:
+			# Quadratic:
 			else:
+				faces.append(itemgetter(*[0, 1, 3])(conn))
+				faces.append(itemgetter(*[1, 2, 4])(conn))
+				faces.append(itemgetter(*[2, 0, 5])(conn))
 				
-				# Linear:
-				if (len(conn) == 3.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5])(conn)
-					
-					linearAndQuad[1] = 1
+				order = 1
+			
+		# Treat shell surface as whole shell:
+		else:
+			
+			# Linear:
+			if (len(conn) == 4.0):
+				faces.append(itemgetter(*[0, 1, 2])(conn))
 				
-				indexIncrement = 1
+				order = 0
 				
-		# ELTYPE General quadrilateral membrane elements:
-		elif ((element.type == 'M3D4') or (element.type == 'M3D4R') or (element.type == 'M3D8') or (element.type == 'M3D8R') or (element.type == 'M3D9') or (element.type == 'M3D9R')):
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5])(conn))
 				
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+				order = 1
+			
+	# ELTYPE Axisymmetric solid quadrilateral elements:
+	elif ((elementType == 'CAX4') or (elementType == 'CAX4H') or (elementType == 'CAX4I') or (elementType == 'CAX4IH') or (elementType == 'CAX4R') or (elementType == 'CAX4RH') or (elementType == 'CGAX4') or (elementType == 'CGAX4H') or (elementType == 'CGAX4R') or (elementType == 'CGAX4RH') or (elementType == 'CAX4T') or (elementType == 'CAX4HT') or (elementType == 'CAX4RT') or (elementType == 'CAX4RHT') or (elementType == 'CGAX4T') or (elementType == 'CGAX4HT') or (elementType == 'CGAX4RT') or (elementType == 'CGAX4RHT') or (elementType == 'CAX4P') or (elementType == 'CAX4PH') or (elementType == 'CAX4RP') or (elementType == 'CAX4RPH') or (elementType == 'CAX4PT') or (elementType == 'CAX4RPT') or (elementType == 'CAX4RPHT') or (elementType == 'COHAX4') or (elementType == 'CAX8') or (elementType == 'CAX8H') or (elementType == 'CAX8R') or (elementType == 'CAX8RH') or (elementType == 'CGAX8') or (elementType == 'CGAX8H') or (elementType == 'CGAX8R') or (elementType == 'CGAX8RH') or (elementType == 'CAX8T') or (elementType == 'CAX8HT') or (elementType == 'CAX8RT') or (elementType == 'CAX8RHT') or (elementType == 'CGAX8T') or (elementType == 'CGAX8HT') or (elementType == 'CGAX8RT') or (elementType == 'CGAX8RHT') or (elementType == 'CAX8P') or (elementType == 'CAX8PH') or (elementType == 'CAX8RP') or (elementType == 'CAX8RPH')):
+		
+		# Treat shell surface as shell faces:
+		if shellFaces:
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
+			# Linear:
+			if (len(conn) == 4):
+				faces.append(itemgetter(*[0, 1])(conn))
+				faces.append(itemgetter(*[1, 2])(conn))
+				faces.append(itemgetter(*[2, 3])(conn))
+				faces.append(itemgetter(*[3, 0])(conn))
 				
-				# Linear:
-				if (len(conn) == 4):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 4])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 5])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3, 6])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0, 7])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 4
+				order = 0
 				
-			# Treat shell surface as whole shell:
+			# Quadratic:
 			else:
+				faces.append(itemgetter(*[0, 1, 4])(conn))
+				faces.append(itemgetter(*[1, 2, 5])(conn))
+				faces.append(itemgetter(*[2, 3, 6])(conn))
+				faces.append(itemgetter(*[3, 0, 7])(conn))
 				
-				# Linear:
-				if (len(conn) == 4.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn)
-					
-					linearAndQuad[1] = 1
+				order = 1
+			
+		# Treat shell surface as whole shell:
+		else:
+			
+			# Linear:
+			if (len(conn) == 4.0):
+				faces.append(itemgetter(*[0, 1, 2, 3])(conn))
 				
-				indexIncrement = 1
+				order = 0
 				
-		# ELTYPE 3D continuum triangular shell elements:
-		elif ((element.type == 'SC6R') or (element.type == 'SC6RT')):
-			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+			# Quadratic:
+			else:
+				faces.append(itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn))
+				
+				order = 1
+	else:
+		# This element is not supported by the surface detection algorithm
+		return None, None, None
+		
+	return faces, shape, order
+		
+def readChunks(instance, elementIDs):
+	# Generator yielding chunks of (label, type, connectivity) from the part instance.
+	chunk = []
+	
+	if elementIDs is None:
+		for element in instance.elements:
+			chunk.append((element.label, element.type, element.connectivity))
 			
-			faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-			faces[index + 1][:] = itemgetter(*[3, 5, 4])(conn)
-			faces[index + 2][:] = itemgetter(*[0, 3, 4, 1])(conn)
-			faces[index + 3][:] = itemgetter(*[1, 4, 5, 2])(conn)
-			faces[index + 4][:] = itemgetter(*[2, 5, 3, 0])(conn)
+			if (len(chunk) == CHUNK_SIZE):
+				yield chunk
+				chunk = []
+	else:
+		for label in elementIDs:
+			# Skip labels which do not belong to the part instance:
+			try:
+				element = instance.getElementFromLabel(int(label))
+			except Exception:
+				continue
+				
+			chunk.append((element.label, element.type, element.connectivity))
 			
-			linearAndQuad[0] = 1
+			if (len(chunk) == CHUNK_SIZE):
+				yield chunk
+				chunk = []
+				
+	if (len(chunk) > 0):
+		yield chunk
+		
+def processElements(instance, elementIDs, processChunk, nThreads):
+	# Apply PROCESSCHUNK to every chunk of element data and return the results in
+	# reading order. If NTHREADS is greater than zero, the ODB is read in a separate
+	# thread and the chunks are processed by NTHREADS worker threads.
+	if (nThreads < 1):
+		return [processChunk(chunk) for chunk in readChunks(instance, elementIDs)]
+		
+	# Bounded queue between the reader and the workers:
+	chunks = Queue.Queue(QUEUE_SIZE)
+	results = {}
+	errors = []
+	
+	def reader():
+		try:
+			for chunkNumber, chunk in enumerate(readChunks(instance, elementIDs)):
+				# Stop reading if a worker has failed:
+				if (len(errors) > 0):
+					break
+					
+				chunks.put((chunkNumber, chunk))
+		except:
+			errors.append(sys.exc_info())
+		finally:
+			# Signal the end of the data to each worker:
+			for i in range(nThreads):
+				chunks.put(None)
+				
+	def worker():
+		while True:
+			item = chunks.get()
 			
-			indexIncrement = 5
+			if item is None:
+				break
+				
+			# Keep draining the queue after an error so that the reader cannot block:
+			if (len(errors) > 0):
+				continue
+				
+			try:
+				results[item[0]] = processChunk(item[1])
+			except:
+				errors.append(sys.exc_info())
+				
+	threads = [threading.Thread(target = reader)] + [threading.Thread(target = worker) for i in range(nThreads)]
+	
+	for thread in threads:
+		thread.start()
+		
+	for thread in threads:
+		thread.join()
+		
+	if (len(errors) > 0):
+		raise errors[0][0], errors[0][1], errors[0][2]
+		
+	return [results[i] for i in sorted(results)]
+	
+def getFaceCounts(chunk, shellFaces):
+	# Count the sorted node keys of each element face in the chunk.
+	faceCounts = Counter()
+	
+	# Container for existing element types:
+	tetAndHex = [0 for x in range(2)]
+	
+	# Container for existing element orders:
+	linearAndQuad = [0 for x in range(2)]
+	
+	# Buffer containing any unsupported elements:
+	unsupportedElements = []
+	
+	for label, elementType, conn in chunk:
+		faces, shape, order = getFaces(elementType, conn, shellFaces)
+		
+		if faces is None:
+			unsupportedElements.append(elementType)
+			continue
 			
-		# ELTYPE 3D continuum hexahedral shell elements:
-		elif ((element.type == 'SC8R') or (element.type == 'SC8RT')):
+		faceCounts.update([tuple(sorted(x)) for x in faces])
+		
+		if shape is not None:
+			tetAndHex[shape] = 1
+		if order is not None:
+			linearAndQuad[order] = 1
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	return faceCounts, tetAndHex, linearAndQuad, unsupportedElements
+	
+def getConnectedElements(chunk, surfaceNodes):
+	# Get the elements in the chunk which share at least one node with the surface.
+	surfaceElements = []
+	surfaceConnectingNodes = []
+	
+	for label, elementType, conn in chunk:
+		if not surfaceNodes.isdisjoint(conn):
+			surfaceElements.append(label)
+			surfaceConnectingNodes.append(conn)
 			
-			faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-			faces[index + 1][:] = itemgetter(*[4, 7, 6, 5])(conn)
-			faces[index + 2][:] = itemgetter(*[0, 4, 5, 1])(conn)
-			faces[index + 3][:] = itemgetter(*[1, 5, 6, 2])(conn)
-			faces[index + 4][:] = itemgetter(*[2, 6, 7, 3])(conn)
-			faces[index + 5][:] = itemgetter(*[3, 7, 4, 0])(conn)
+	return surfaceElements, surfaceConnectingNodes
+	
+def readLabels(fileName):
+	# Read the main IDs, sub IDs and instance numbers of the dataset rows.
+	fid = open(fileName, 'rb')
+	
+	nRows = array.array('i')
+	nRows.fromfile(fid, 1)
+	
+	mainIDs = array.array('i')
+	mainIDs.fromfile(fid, nRows[0])
+	
+	subIDs = array.array('i')
+	subIDs.fromfile(fid, nRows[0])
+	
+	instanceIDs = array.array('i')
+	instanceIDs.fromfile(fid, nRows[0])
+	
+	fid.close()
+	
+	return mainIDs, subIDs, instanceIDs
+	
+def getLabelMask(labels):
+	# Get a membership test for LABELS. A dense bitmap is used if the labels are
+	# compact, otherwise the labels are hashed.
+	maxLabel = max(labels) if (len(labels) > 0) else 0
+	
+	if (maxLabel > 8*len(labels) + 65536):
+		labelSet = set(labels)
+		return lambda label: label in labelSet
+		
+	bitmap = bytearray(maxLabel + 1)
+	
+	for label in labels:
+		if (label > 0):
+			bitmap[label] = 1
 			
-			linearAndQuad[0] = 1
+	return lambda label: (0 < label <= maxLabel) and (bitmap[label] == 1)
+	
+def getSurfaceIndices(labels, instanceIDs, surfaceLabels):
+	# Get the 1-based indices of the dataset rows whose label lies on the surface.
+	# SURFACELABELS contains the surface labels of each part instance.
+	masks = [getLabelMask([i for j in surfaceLabels for i in j])] + [getLabelMask(x) for x in surfaceLabels]
+	
+	return [i + 1 for i in xrange(len(labels)) if (0 <= instanceIDs[i] < len(masks)) and masks[instanceIDs[i]](labels[i])]
+	
+def getRuns(labels):
+	# Get the runs of consecutive labels from a sorted list of unique labels.
+	starts = array.array('i')
+	ends = array.array('i')
+	
+	for label in labels:
+		if (len(ends) > 0) and (label == ends[-1] + 1):
+			ends[-1] = label
+		else:
+			starts.append(label)
+			ends.append(label)
 			
-			indexIncrement = 6
+	return starts, ends
+	
+def unionRuns(a, b):
+	# Get the union of two run lists.
+	starts = array.array('i')
+	ends = array.array('i')
+	i = 0
+	j = 0
+	
+	while (i < len(a[0])) or (j < len(b[0])):
+		# Take the run with the lowest start label:
+		if (j >= len(b[0])) or ((i < len(a[0])) and (a[0][i] <= b[0][j])):
+			start, end = a[0][i], a[1][i]
+			i += 1
+		else:
+			start, end = b[0][j], b[1][j]
+			j += 1
 			
-		# ELTYPE 3D continuum solid hexahedral shell elements
-		elif (element.type == 'CSS8'):
+		# Extend the previous run if the runs overlap or touch:
+		if (len(ends) > 0) and (start <= ends[-1] + 1):
+			if (end > ends[-1]):
+				ends[-1] = end
+		else:
+			starts.append(start)
+			ends.append(end)
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	return starts, ends
+	
+def intersectRuns(a, b):
+	# Get the intersection of two run lists.
+	starts = array.array('i')
+	ends = array.array('i')
+	i = 0
+	j = 0
+	
+	while (i < len(a[0])) and (j < len(b[0])):
+		start = max(a[0][i], b[0][j])
+		end = min(a[1][i], b[1][j])
+		
+		if (start <= end):
+			starts.append(start)
+			ends.append(end)
 			
-			faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-			faces[index + 1][:] = itemgetter(*[4, 7, 6, 5])(conn)
-			faces[index + 2][:] = itemgetter(*[0, 4, 5, 1])(conn)
-			faces[index + 3][:] = itemgetter(*[1, 5, 6, 2])(conn)
-			faces[index + 4][:] = itemgetter(*[2, 6, 7, 3])(conn)
-			faces[index + 5][:] = itemgetter(*[3, 7, 4, 0])(conn)
+		# Advance the run which ends first:
+		if (a[1][i] < b[1][j]):
+			i += 1
+		else:
+			j += 1
 			
-			linearAndQuad[0] = 1
+	return starts, ends
+	
+def differenceRuns(a, b):
+	# Get the labels of run list A which are not in run list B.
+	starts = array.array('i')
+	ends = array.array('i')
+	j = 0
+	
+	for i in xrange(len(a[0])):
+		start, end = a[0][i], a[1][i]
+		
+		# Skip the runs of B which end before this run:
+		while (j < len(b[0])) and (b[1][j] < start):
+			j += 1
 			
-			indexIncrement = 6
+		# Cut out the runs of B which overlap this run:
+		k = j
+		
+		while (k < len(b[0])) and (b[0][k] <= end) and (start <= end):
+			if (b[0][k] > start):
+				starts.append(start)
+				ends.append(b[0][k] - 1)
+				
+			start = max(start, b[1][k] + 1)
+			k += 1
 			
-		# ELTYPE 2D continuum triangular elements:
-		elif ((element.type == 'CPE3') or (element.type == 'CPE3H') or (element.type == 'CPE6') or (element.type == 'CPE6H') or (element.type == 'CPE6M') or (element.type == 'CPE6MH') or (element.type == 'CPS3') or (element.type == 'CPS6') or (element.type == 'CPS6M') or (element.type == 'CPEG3') or (element.type == 'CPEG3H') or (element.type == 'CPEG6') or (element.type == 'CPEG6H') or (element.type == 'CPEG6M') or (element.type == 'CPEG6MH')):
+		if (start <= end):
+			starts.append(start)
+			ends.append(end)
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+	return starts, ends
+	
+class LabelSet(object):
+	# Compact set of instance-qualified node or element labels.
+	#
+	# The labels of each part instance are stored as runs of consecutive labels in
+	# two sorted int32 arrays (first and last label of each run). Surface labels are
+	# often contiguous, so a run replaces many labels. Set operations merge the runs
+	# in linear time. Labels which do not belong to a part instance are stored
+	# under the instance name ''.
+	
+	def __init__(self, labels = None, instance = ''):
+		# Create a set from an iterable of labels belonging to INSTANCE.
+		self.runs = {}
+		
+		if labels is not None:
+			runs = getRuns(sorted(set(labels)))
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
-				
-				# Linear:
-				if (len(conn) == 3):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 3])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 4])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0, 5])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 3
-				
-			# Treat shell surface as whole shell:
-			else:
-				
-				# Linear:
-				if (len(conn) == 4.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5])(conn)
-					
-					linearAndQuad[1] = 1
+			if (len(runs[0]) > 0):
+				self.runs[instance] = runs
 				
-				indexIncrement = 1
+	def instances(self):
+		# Get the part instances with at least one label.
+		return sorted(self.runs.keys())
+		
+	def labels(self, instance = None):
+		# Generator yielding the sorted labels of INSTANCE. If INSTANCE is None, the
+		# labels of all part instances are merged.
+		if instance is None:
+			runs = self.unqualified().runs.get('', (array.array('i'), array.array('i')))
+		else:
+			runs = self.runs.get(instance, (array.array('i'), array.array('i')))
+			
+		for i in xrange(len(runs[0])):
+			for label in xrange(runs[0][i], runs[1][i] + 1):
+				yield label
 				
-		# ELTYPE 2D Continuum quadrilateral elements:
-		elif ((element.type == 'CPE4') or (element.type == 'CPE4H') or (element.type == 'CPE4I') or (element.type == 'CPE4IH') or (element.type == 'CPE4R') or (element.type == 'CPE4RH') or (element.type == 'CPE8') or (element.type == 'CPE8H') or (element.type == 'CPE8R') or (element.type == 'CPE8RH') or (element.type == 'CPS4') or (element.type == 'CPS4I') or (element.type == 'CPS4R') or (element.type == 'CPS8') or (element.type == 'CPS8R') or (element.type == 'CPEG4') or (element.type == 'CPEG4H') or (element.type == 'CPEG4I') or (element.type == 'CPEG4IH') or (element.type == 'CPEG4R') or (element.type == 'CPEG4RH') or (element.type == 'CPEG8') or (element.type == 'CPEG8H') or (element.type == 'CPEG8R') or (element.type == 'CPEG8RH')):
+	def unqualified(self):
+		# Get the union of the labels of all part instances under the instance name ''.
+		result = LabelSet()
+		runs = (array.array('i'), array.array('i'))
+		
+		for instance in self.instances():
+			runs = unionRuns(runs, self.runs[instance])
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+		if (len(runs[0]) > 0):
+			result.runs[''] = runs
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
-				
-				# Linear:
-				if (len(conn) == 4):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 4])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 5])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3, 6])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0, 7])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 4
-				
-			# Treat shell surface as whole shell:
+		return result
+		
+	def combine(self, other, operation, keepSelf, keepOther):
+		# Apply the run list OPERATION to each part instance of both sets.
+		result = LabelSet()
+		
+		for instance in set(self.runs.keys()) | set(other.runs.keys()):
+			if (instance in self.runs) and (instance in other.runs):
+				runs = operation(self.runs[instance], other.runs[instance])
+			elif (instance in self.runs) and keepSelf:
+				runs = self.runs[instance]
+			elif (instance in other.runs) and keepOther:
+				runs = other.runs[instance]
 			else:
+				continue
 				
-				# Linear:
-				if (len(conn) == 4.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn)
-					
-					linearAndQuad[1] = 1
-				
-				indexIncrement = 1
+			if (len(runs[0]) > 0):
+				result.runs[instance] = runs
 				
-		# ELTYPE Axisymmetric solid triangular elements:
-		elif ((element.type == 'CAX3') or (element.type == 'CAX3H') or (element.type == 'CGAX3') or (element.type == 'CGAX3H') or (element.type == 'CAX3T') or (element.type == 'CGAX3T') or (element.type == 'CGAX3HT') or (element.type == 'CAX6') or (element.type == 'CAX6H') or (element.type == 'CAX6M') or (element.type == 'CAX6MH') or (element.type == 'CGAX6') or (element.type == 'CGAX6H') or (element.type == 'CGAX6M') or (element.type == 'CGAX6MH') or (element.type == 'CAX6MT') or (element.type == 'CAX6MHT') or (element.type == 'CGAX6MT') or (element.type == 'CGAX6MHT') or (element.type == 'CAX6MP') or (element.type == 'CAX6MPH')):
+		return result
+		
+	def union(self, other):
+		return self.combine(other, unionRuns, True, True)
+		
+	def intersection(self, other):
+		return self.combine(other, intersectRuns, False, False)
+		
+	def difference(self, other):
+		return self.combine(other, differenceRuns, True, False)
+		
+	__or__ = union
+	__and__ = intersection
+	__sub__ = difference
+	
+	def __contains__(self, item):
+		# ITEM is a label or an (instance, label) tuple.
+		if isinstance(item, tuple):
+			instance, label = item
+		else:
+			instance, label = '', item
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+		if instance not in self.runs:
+			return False
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
-				
-				# Linear:
-				if (len(conn) == 3):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 3])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 4])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 0, 5])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 3
-				
-			# Treat shell surface as whole shell:
-			else:
-				
-				# Linear:
-				if (len(conn) == 4.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5])(conn)
-					
-					linearAndQuad[1] = 1
-				
-				indexIncrement = 1
+		starts, ends = self.runs[instance]
+		i = bisect.bisect_right(starts, label) - 1
+		
+		return (i >= 0) and (label <= ends[i])
+		
+	def __iter__(self):
+		# Iterate over (instance, label) tuples.
+		for instance in self.instances():
+			for label in self.labels(instance):
+				yield (instance, label)
 				
-		# ELTYPE Axisymmetric solid quadrilateral elements:
-		elif ((element.type == 'CAX4') or (element.type == 'CAX4H') or (element.type == 'CAX4I') or (element.type == 'CAX4IH') or (element.type == 'CAX4R') or (element.type == 'CAX4RH') or (element.type == 'CGAX4') or (element.type == 'CGAX4H') or (element.type == 'CGAX4R') or (element.type == 'CGAX4RH') or (element.type == 'CAX4T') or (element.type == 'CAX4HT') or (element.type == 'CAX4RT') or (element.type == 'CAX4RHT') or (element.type == 'CGAX4T') or (element.type == 'CGAX4HT') or (element.type == 'CGAX4RT') or (element.type == 'CGAX4RHT') or (element.type == 'CAX4P') or (element.type == 'CAX4PH') or (element.type == 'CAX4RP') or (element.type == 'CAX4RPH') or (element.type == 'CAX4PT') or (element.type == 'CAX4RPT') or (element.type == 'CAX4RPHT') or (element.type == 'COHAX4') or (element.type == 'CAX8') or (element.type == 'CAX8H') or (element.type == 'CAX8R') or (element.type == 'CAX8RH') or (element.type == 'CGAX8') or (element.type == 'CGAX8H') or (element.type == 'CGAX8R') or (element.type == 'CGAX8RH') or (element.type == 'CAX8T') or (element.type == 'CAX8HT') or (element.type == 'CAX8RT') or (element.type == 'CAX8RHT') or (element.type == 'CGAX8T') or (element.type == 'CGAX8HT') or (element.type == 'CGAX8RT') or (element.type == 'CGAX8RHT') or (element.type == 'CAX8P') or (element.type == 'CAX8PH') or (element.type == 'CAX8RP') or (element.type == 'CAX8RPH')):
+	def __len__(self):
+		return sum(sum(ends) - sum(starts) + len(starts) for starts, ends in self.runs.itervalues())
+		
+	def __eq__(self, other):
+		return isinstance(other, LabelSet) and (self.runs == other.runs)
+		
+	def __ne__(self, other):
+		return not self.__eq__(other)
+		
+	def __repr__(self):
+		return 'LabelSet(%s)' % dict([(x, zip(self.runs[x][0], self.runs[x][1])) for x in self.instances()])
+		
+	def write(self, fileName):
+		# Write the set to a binary file. The file contains the number of part
+		# instances followed by, for each part instance, the length of the instance
+		# name, the instance name, the number of runs and the first and last label of
+		# each run as int32 arrays.
+		fid = open(fileName, 'wb')
+		array.array('i', [len(self.runs)]).tofile(fid)
+		
+		for instance in self.instances():
+			starts, ends = self.runs[instance]
+			array.array('i', [len(instance)]).tofile(fid)
+			fid.write(instance)
+			array.array('i', [len(starts)]).tofile(fid)
+			starts.tofile(fid)
+			ends.tofile(fid)
 			
-			# Increment INDEX face node variable:
-			if (i > 0):
-				index = index + indexIncrement
+		fid.close()
+		
+	@staticmethod
+	def read(fileName):
+		# Read a set written by LabelSet.write().
+		result = LabelSet()
+		fid = open(fileName, 'rb')
+		
+		nInstances = array.array('i')
+		nInstances.fromfile(fid, 1)
+		
+		for i in xrange(nInstances[0]):
+			nameLength = array.array('i')
+			nameLength.fromfile(fid, 1)
+			instance = fid.read(nameLength[0])
 			
-			# Treat shell surface as shell faces:
-			if (SHELL_FACES.lower() == 'yes'):
-				
-				# Linear:
-				if (len(conn) == 4):
-					faces[index + 0][:] = itemgetter(*[0, 1])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 4])(conn)
-					faces[index + 1][:] = itemgetter(*[1, 2, 5])(conn)
-					faces[index + 2][:] = itemgetter(*[2, 3, 6])(conn)
-					faces[index + 3][:] = itemgetter(*[3, 0, 7])(conn)
-					
-					linearAndQuad[1] = 1
-					
-				indexIncrement = 4
-				
-			# Treat shell surface as whole shell:
-			else:
-				
-				# Linear:
-				if (len(conn) == 4.0):
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3])(conn)
-					
-					linearAndQuad[0] = 1
-					
-				# Quadratic:
-				else:
-					faces[index + 0][:] = itemgetter(*[0, 1, 2, 3, 4, 5, 6, 7])(conn)
-					
-					linearAndQuad[1] = 1
-				
-				indexIncrement = 1
-		else:
-			# This element is not supported by the surface detection algorithm
-			unsupportedElements.append(element.type)
-			indexIncrement = 0
+			nRuns = array.array('i')
+			nRuns.fromfile(fid, 1)
 			
-	# Get surface nodes from unique faces:
-	surfaceNodes = Counter([tuple(sorted(x)) for x in faces])
-	surfaceNodes = [list(k) for k, v in surfaceNodes.items() if v == 1]
+			starts = array.array('i')
+			starts.fromfile(fid, nRuns[0])
+			
+			ends = array.array('i')
+			ends.fromfile(fid, nRuns[0])
+			
+			result.runs[instance] = (starts, ends)
+			
+		fid.close()
+		
+		return result
+		
+def getPositions(position):
+	# Get the list of element positions from a position, a comma-separated list of
+	# positions or a sequence of positions.
+	if isinstance(position, basestring):
+		position = position.split(',')
+		
+	return [x.strip().lower() for x in position]
+	
+def getInstanceSurface(instance, position = 'NODAL', shellFaces = False, elementLabels = None, pipeline = 0):
+	# Find the free surface of an ODB part instance.
+	#
+	# POSITION is 'NODAL', 'ELEMENTAL' or 'CENTROID', or a list of these positions
+	# (see getPositions()). The free faces are found once, and the outputs for
+	# every requested position are derived from them. If SHELLFACES is True, the
+	# shell surface is treated as free shell faces. ELEMENTLABELS limits the search
+	# to a list of element labels (default all elements). PIPELINE is the number of
+	# face processing threads (default 0, sequential).
+	#
+	# Returns a dictionary with the following keys:
+	#	'nodes': LabelSet of the surface nodes
+	#	'elements': LabelSet of the surface elements (ELEMENTAL or CENTROID only)
+	#	'connectivity': Surface element connectivity in element label order
+	#	(ELEMENTAL only)
+	#	'elemIncompatible': True if tetrahedral and hexahedral elements are mixed
+	#	'geomIncompatible': True if linear and quadratic elements are mixed
+	#	'unsupportedElements': Element types not supported by the algorithm
+	
+	# Container for existing element types:
+	tetAndHex = [0 for x in range(2)]
 	
-	# Flatten node set into iterable list:
-	surfaceNodes = list(set(i for j in surfaceNodes for i in j))
+	# Container for existing element orders:
+	linearAndQuad = [0 for x in range(2)]
+	
+	# Initialize buffer containing any unsupported elements:
+	unsupportedElements = []
+	
+	# Count the element faces over all chunks:
+	faceCounts = Counter()
+	
+	for result in processElements(instance, elementLabels, lambda chunk: getFaceCounts(chunk, shellFaces), pipeline):
+		faceCounts.update(result[0])
+		tetAndHex = [max(x) for x in zip(tetAndHex, result[1])]
+		linearAndQuad = [max(x) for x in zip(linearAndQuad, result[2])]
+		unsupportedElements.extend(result[3])
+		
+	# Get surface nodes from unique faces:
+	surfaceNodes = [k for k, v in faceCounts.iteritems() if v == 1]
 	
-	# Add current node set to global surface node set:
-	surfaceNodesAll[instanceNumber][:] = surfaceNodes
+	# Flatten node set into compact label set:
+	surfaceNodes = LabelSet((i for j in surfaceNodes for i in j), instance.name)
 	
 	# Get surface elements from surface nodes:
-	if (POSITION.lower() == 'elemental') or (POSITION.lower() == 'centroid'):
-		surfaceElements = []
-		surfaceConnectingNodes = []
-		
-		for j in range(N):
-			if (SEARCH_REGION.lower() == 'dataset'):
-				# Get element object:
-				element = instance.getElementFromLabel(int(ELEMENT_ID[j]))
-				# Get element connectivity data:
-				conn = element.connectivity
-			else:
-				# Get element object:
-				element = instance.elements[j]
-				# Get element connectivity data:
-				conn = instance.getElementFromLabel(element.label).connectivity
-				
-			# Get intersection of connectivity with surface node list:
-			intersect = [i for i in surfaceNodes if i in conn]
+	positions = getPositions(position)
+	surfaceElements = []
+	surfaceConnectingNodes = []
+	
+	if ('elemental' in positions) or ('centroid' in positions):
+		surfaceNodeSet = set(surfaceNodes.labels(instance.name))
+		
+		for result in processElements(instance, elementLabels, lambda chunk: getConnectedElements(chunk, surfaceNodeSet), pipeline):
+			surfaceElements.extend(result[0])
 			
-			# Check if there are any intersecting nodes:
-			if (len(intersect) != 0):
-				# Element j lies on surface, so append element:
-				surfaceElements.append(element.label)
+			if ('elemental' in positions):
+				surfaceConnectingNodes.extend(result[1])
 				
-				if (POSITION.lower() == 'elemental'):
-					surfaceConnectingNodes.append(conn)
-					
-		# Add current node set to global surface element set:
-		surfaceElementsAll[instanceNumber][:] = surfaceElements
-		surfaceConnectingNodesAll[instanceNumber][:] = surfaceConnectingNodes
-		
-	# Check if there is an element shape incompatibility:
-	if (tetAndHex[0] == 1 and tetAndHex[1] == 1):
-		print "'%s' ELEM_INCOMPATIBLE" % partInstance
-		
-	# Check if there is a geometric order incompatibility:
-	if (linearAndQuad[0] == 1 and linearAndQuad[1] == 1):
-		print "'%s' GEOM_INCOMPATIBLE" % partInstance
-		
-# Write surface node set to text file:
-if (POSITION.lower() == 'nodal'):
-	if (nInstances == 1):
-		nodesToFile = surfaceNodesAll[0]
-	else:
-		for i in range(len(surfaceNodesAll) - 1):
-			nodesToFile = surfaceNodesAll[i] + surfaceNodesAll[i + 1]
+		# Order the connectivity by element label to match the label set:
+		if ('elemental' in positions):
+			surfaceConnectingNodes = [x[1] for x in sorted(zip(surfaceElements, surfaceConnectingNodes))]
 			
-	directory = "%s/Application_Files/code/odb_interface/surface_nodes.dat" % os.path.dirname(os.path.abspath("__file__"))
-	f = open(directory, 'w+')
-	string = '%s' % nodesToFile
-	f.write(string)
-	f.close()
-elif (POSITION.lower() == 'elemental'):
-	if (nInstances == 1):
-		elementsToFile = surfaceElementsAll[0]
-		nodesToFile = surfaceConnectingNodesAll[0]
-	else:
-		for i in range(len(surfaceElementsAll) - 1):
-			elementsToFile = surfaceElementsAll[i] + surfaceElementsAll[i + 1]
-			nodesToFile = surfaceConnectingNodesAll[i] + surfaceConnectingNodesAll[i + 1]
+	return {'nodes': surfaceNodes,
+		'elements': LabelSet(surfaceElements, instance.name),
+		'connectivity': surfaceConnectingNodes,
+		'elemIncompatible': (tetAndHex[0] == 1 and tetAndHex[1] == 1),
+		'geomIncompatible': (linearAndQuad[0] == 1 and linearAndQuad[1] == 1),
+		'unsupportedElements': list(set(unsupportedElements))}
+		
+def getSurface(odb, partInstances = None, position = 'NODAL', shellFaces = False, elementLabels = None, pipeline = 0):
+	# Find the free surface of the part instances of an open ODB.
+	#
+	# ODB is an open output database or a single part instance. PARTINSTANCES is a
+	# list of part instance names (default all part instances). ELEMENTLABELS is a
+	# list of element labels applied to every part instance, or a dictionary of
+	# element label lists keyed by part instance name. The remaining options are
+	# described in getInstanceSurface().
+	#
+	# Returns a dictionary of getInstanceSurface() results keyed by part instance name.
+	if not hasattr(odb, 'rootAssembly'):
+		return {odb.name: getInstanceSurface(odb, position, shellFaces, elementLabels, pipeline)}
+		
+	if partInstances is None:
+		partInstances = odb.rootAssembly.instances.keys()
+		
+	surface = {}
+	
+	for partInstance in partInstances:
+		if isinstance(elementLabels, dict):
+			instanceLabels = elementLabels.get(partInstance, [])
+		else:
+			instanceLabels = elementLabels
 			
-	directory = "%s/Application_Files/code/odb_interface/surface_elements.dat" % os.path.dirname(os.path.abspath("__file__"))
-	f = open(directory, 'w+')
-	string = '%s' % elementsToFile
-	f.write(string)
-	f.close()
+		surface[partInstance] = getInstanceSurface(odb.rootAssembly.instances[partInstance], position, shellFaces, instanceLabels, pipeline)
+		
+	return surface
 	
-	directory = "%s/Application_Files/code/odb_interface/surface_nodes.dat" % os.path.dirname(os.path.abspath("__file__"))
+def writeList(fileName, values):
+	# Write a list to a text file in the ODB interface directory.
+	directory = "%s/Application_Files/code/odb_interface/%s" % (os.path.dirname(os.path.abspath("__file__")), fileName)
 	f = open(directory, 'w+')
-	string = '%s' % nodesToFile
+	string = '%s' % values
 	f.write(string)
 	f.close()
-elif (POSITION.lower() == 'centroid'):
-	if (nInstances == 1):
-		elementsToFile = surfaceElementsAll[0]
+	
+def main(argv):
+	# Command line interface used by getSurface.m.
+	N_INSTANCES = int(argv[-1])
+	PART_INSTANCES = argv[-1 - N_INSTANCES:-1]
+	
+	ODB_NAME = argv[-5 - N_INSTANCES]
+	POSITION = argv[-4 - N_INSTANCES]
+	SEARCH_REGION = argv[-3 - N_INSTANCES]
+	SHELL_FACES = argv[-2 - N_INSTANCES]
+	
+	# Get the optional arguments preceding the ODB name:
+	PIPELINE = 0
+	
+	for arg in argv[1:-5 - N_INSTANCES]:
+		if arg.lower().startswith('-pipeline='):
+			PIPELINE = int(arg.split('=')[1])
+			
+	# Debug output:
+	print "ODB Name: %s" % ODB_NAME
+	print "Result position: %s" % POSITION
+	print "Search region: %s" % SEARCH_REGION
+	print "Shell faces: %s" % SHELL_FACES
+	print "Part instance: %s" % PART_INSTANCES
+	print "Number of instances: %s" % N_INSTANCES
+	print "Pipeline threads: %s\n" % PIPELINE
+	
+	# Get the requested positions:
+	POSITIONS = getPositions(POSITION)
+	elementPositions = [x for x in POSITIONS if x != 'nodal']
+	
+	# Open ODB file:
+	odb = openOdb(path = ODB_NAME)
+	
+	# Get number of part instances:
+	nInstances = len(PART_INSTANCES)
+	
+	# Get the dataset elements belonging to each part instance:
+	ELEMENT_ID = None
+	
+	if (SEARCH_REGION.lower() == 'dataset'):
+		directory = "%s/Application_Files/code/odb_interface/dataset_labels.dat" % os.path.dirname(os.path.abspath("__file__"))
+		MAIN_ID, SUB_ID, INSTANCE_ID = readLabels(directory)
+		
+		if (len(elementPositions) > 0):
+			ELEMENT_ID = {}
+			
+			for instanceNumber in range(nInstances):
+				ELEMENT_ID[PART_INSTANCES[instanceNumber]] = sorted(set(MAIN_ID[i] for i in xrange(len(MAIN_ID)) if INSTANCE_ID[i] in (0, instanceNumber + 1)))
+				
+	# The nodal position always searches the whole part instance:
+	if ('nodal' in POSITIONS) and (len(elementPositions) > 0) and (ELEMENT_ID is not None):
+		surfaces = [getSurface(odb, PART_INSTANCES, 'nodal', SHELL_FACES.lower() == 'yes', None, PIPELINE),
+			getSurface(odb, PART_INSTANCES, elementPositions, SHELL_FACES.lower() == 'yes', ELEMENT_ID, PIPELINE)]
+		surfaceByPosition = dict([(x, surfaces[0] if x == 'nodal' else surfaces[1]) for x in POSITIONS])
 	else:
-		for i in range(len(surfaceElementsAll) - 1):
-			elementsToFile = surfaceElementsAll[i] + surfaceElementsAll[i + 1]
+		surfaces = [getSurface(odb, PART_INSTANCES, POSITIONS, SHELL_FACES.lower() == 'yes', ELEMENT_ID, PIPELINE)]
+		surfaceByPosition = dict([(x, surfaces[0]) for x in POSITIONS])
+		
+	unsupportedElements = []
+	
+	for partInstance in PART_INSTANCES:
+		# Check if there is an element shape incompatibility:
+		if any(x[partInstance]['elemIncompatible'] for x in surfaces):
+			print "'%s' ELEM_INCOMPATIBLE" % partInstance
 			
-	directory = "%s/Application_Files/code/odb_interface/surface_elements.dat" % os.path.dirname(os.path.abspath("__file__"))
-	f = open(directory, 'w+')
-	string = '%s' % elementsToFile
-	f.write(string)
-	f.close()
+		# Check if there is a geometric order incompatibility:
+		if any(x[partInstance]['geomIncompatible'] for x in surfaces):
+			print "'%s' GEOM_INCOMPATIBLE" % partInstance
+			
+		for surface in surfaces:
+			unsupportedElements.extend(surface[partInstance]['unsupportedElements'])
+			
+	for position in POSITIONS:
+		# Single position runs keep the original file names:
+		if (len(POSITIONS) == 1):
+			suffix = ''
+		else:
+			suffix = '_%s' % position
+			
+		# Merge the surface nodes and elements of each part instance:
+		surface = surfaceByPosition[position]
+		surfaceNodesAll = LabelSet()
+		surfaceElementsAll = LabelSet()
+		
+		for partInstance in PART_INSTANCES:
+			surfaceNodesAll = surfaceNodesAll | surface[partInstance]['nodes']
+			surfaceElementsAll = surfaceElementsAll | surface[partInstance]['elements']
+			
+		# Write surface dataset indices to binary file:
+		if (position == 'nodal') and (SEARCH_REGION.lower() == 'dataset'):
+			indicesToFile = array.array('i', getSurfaceIndices(MAIN_ID, INSTANCE_ID, [list(surfaceNodesAll.labels(x)) for x in PART_INSTANCES]))
+			
+			directory = "%s/Application_Files/code/odb_interface/surface_indices%s.dat" % (os.path.dirname(os.path.abspath("__file__")), suffix)
+			f = open(directory, 'wb')
+			indicesToFile.tofile(f)
+			f.close()
+		# Write surface node set to text file:
+		elif (position == 'nodal'):
+			writeList('surface_nodes%s.dat' % suffix, list(surfaceNodesAll.labels()))
+		elif (position == 'elemental'):
+			# Each element is paired with its connectivity, so the elements are not merged:
+			elementsToFile = []
+			nodesToFile = []
+			
+			for partInstance in PART_INSTANCES:
+				elementsToFile.extend(surfaceElementsAll.labels(partInstance))
+				nodesToFile.extend(surface[partInstance]['connectivity'])
+				
+			writeList('surface_elements%s.dat' % suffix, elementsToFile)
+			writeList('surface_nodes%s.dat' % suffix, nodesToFile)
+		elif (position == 'centroid'):
+			writeList('surface_elements%s.dat' % suffix, list(surfaceElementsAll.labels()))
+			
+	# Close ODB:
+	odb.close()
 	
-# Close ODB:
-odb.close()
-
-print "Outcome: SUCCESS"
-print "Unsupported elements: %s" % list(set(unsupportedElements))
\ No newline at end of file
+	print "Outcome: SUCCESS"
+	print "Unsupported elements: %s" % list(set(unsupportedElements))
+	
+if __name__ == '__main__':
+	main(sys.argv)
@@ -67,6 +67,12 @@ setappdata(0, 'shellFaces', 0.0)
 %}
 setappdata(0, 'surfaceMode', 1.0)
 
+%{
+    0: Read the ODB and process element faces sequentially (default)
+    n: Read the ODB in a separate thread and process element faces in n threads
+%}
+setappdata(0, 'surfacePipeline', 0.0)
+
 %% MEAN STRESS CORRECTION
 
 % GOODMAN ENVELOPE DEFINITION